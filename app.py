@@ -13,11 +13,12 @@ from flask_session import Session
 from datetime import datetime
 import qrcode
 import io
+import hashlib
 
 # 引用 queue_core
 from queue_core import (
-    create_ticket, call_next, get_ticket_status,
-    get_stats_for_date, cancel_ticket, get_live_queue_stats, 
+    create_ticket, call_next, get_ticket_status, get_ticket_statuses,
+    get_queue_versions, get_stats_for_date, cancel_ticket, get_live_queue_stats, 
     get_overall_summary, get_hourly_demand, r
 )
 
@@ -382,5 +383,41 @@ def api_ticket_status(ticket_id):
     status = get_ticket_status(ticket_id)
     return jsonify(status) if status else (jsonify({"error": "not found"}), 404)
 
+# 批次查詢 (叫號看板 / Kiosk)：GET /tickets/status?ids=1,2,3
+# ETag 由票號清單 + 各 service 版本號組成，看板內容沒變就直接回 304
+MAX_BATCH_TICKETS = 500
+
+@app.route("/tickets/status", methods=["GET"])
+def api_tickets_status():
+    try:
+        ticket_ids = [int(x) for x in request.args.get("ids", "").split(",") if x.strip()]
+    except ValueError:
+        return jsonify({"error": "invalid ids"}), 400
+    if not ticket_ids: return jsonify({"error": "ids required"}), 400
+    if len(ticket_ids) > MAX_BATCH_TICKETS: return jsonify({"error": f"too many ids (max {MAX_BATCH_TICKETS})"}), 400
+
+    versions = get_queue_versions(ticket_ids)
+    etag_src = json.dumps({"ids": sorted(set(ticket_ids)), "versions": versions}, sort_keys=True)
+    etag = hashlib.sha1(etag_src.encode()).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    statuses = get_ticket_statuses(ticket_ids)
+    tickets, not_found = [], []
+    for tid, status in statuses.items():
+        if not status:
+            not_found.append(tid)
+            continue
+        # 看板是公開畫面，不回傳 token 與 LINE user id
+        status.pop("token", None)
+        status.pop("line_user_id", None)
+        tickets.append(status)
+
+    resp = jsonify({"tickets": tickets, "not_found": not_found})
+    resp.set_etag(etag)
+    return resp
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
\ No newline at end of file
@@ -4,6 +4,7 @@ import json
 import os
 import redis
 import uuid
+from bisect import bisect_left
 from datetime import datetime
 
 
@@ -35,6 +36,10 @@ def ensure_index_exists():
 
 ensure_index_exists()
 
+# 每個 service 的版本號：create / call_next / cancel 時 +1，供批次查詢 API 產生 ETag
+def version_key(service: str) -> str:
+    return f"queue_version:{service}"
+
 # create_ticket
 def create_ticket(service: str, line_user_id: str = "") -> dict:
     pipe = r.pipeline()
@@ -59,6 +64,7 @@ def create_ticket(service: str, line_user_id: str = "") -> dict:
     
     pipe.hset(ticket_key, mapping=mapping_data)
     pipe.xadd(stream_key, {"ticket_id": ticket_id}, maxlen=1000)
+    pipe.incr(version_key(service))
     pipe.execute()
 
     return {
@@ -80,6 +86,7 @@ def call_next(service: str, counter_name: str) -> dict | None:
             for i in range(1, len(res), 2):
                 old_ticket_key = res[i]
                 r.hset(old_ticket_key, "status", "done")
+            r.incr(version_key(service))
     except Exception:
         pass
 
@@ -139,6 +146,7 @@ def call_next(service: str, counter_name: str) -> dict | None:
         # 總服務人數 +1
         pipe.hincrby(stats_key, "count", 1)
         pipe.hincrby(stats_service_key, "count", 1)
+        pipe.incr(version_key(service))
 
         if last_time:
             # 如果有「上一位叫號時間」，代表這不是今天第一位
@@ -168,8 +176,12 @@ def call_next(service: str, counter_name: str) -> dict | None:
 
 def cancel_ticket(ticket_id: int) -> bool:
     ticket_key = f"ticket:{ticket_id}"
-    if not r.exists(ticket_key): return False
-    r.hset(ticket_key, "status", "cancelled")
+    service = r.hget(ticket_key, "service")
+    if service is None: return False
+    pipe = r.pipeline()
+    pipe.hset(ticket_key, "status", "cancelled")
+    pipe.incr(version_key(service))
+    pipe.execute()
     return True
 
 def get_ticket_status(ticket_id: int) -> dict | None:
@@ -195,11 +207,14 @@ def get_ticket_status(ticket_id: int) -> dict | None:
             
     current_number = r.get(f"current_number:{service}")
 
+    return _format_ticket_status(ticket_id, data, ahead_count, current_number)
+
+def _format_ticket_status(ticket_id: int, data: dict, ahead_count: int, current_number: str | None) -> dict:
     return {
         "ticket_id": int(ticket_id),
         "number": int(data["number"]),
-        "service": service,
-        "status": status,
+        "service": data["service"],
+        "status": data["status"],
         "created_at": int(data["created_at"]),
         "called_at": int(data.get("called_at", 0)) if data.get("called_at") else None,
         "counter": data.get("counter", ""),
@@ -209,6 +224,108 @@ def get_ticket_status(ticket_id: int) -> dict | None:
         "token": data.get("token", "")
     }
 
+# get_ticket_statuses: 叫號看板 / Kiosk 一次查多張票
+# 固定 2 次 pipeline 來回：(1) 所有票的 hgetall (2) 每個 service 一次 FT.SEARCH + current_number
+# (等待人數超過 FT.SEARCH 上限時，再多 1 次 pipeline 補精確計數)
+# 前方人數改成在 Python 端對同一 service 的 waiting created_at 排序後用 bisect 計算，不再每張票各查一次
+def get_ticket_statuses(ticket_ids: list[int]) -> dict[int, dict | None]:
+    ticket_ids = list(dict.fromkeys(int(tid) for tid in ticket_ids))
+    if not ticket_ids: return {}
+
+    pipe = r.pipeline(transaction=False)
+    for tid in ticket_ids:
+        pipe.hgetall(f"ticket:{tid}")
+    rows = dict(zip(ticket_ids, pipe.execute()))
+
+    services = sorted({data["service"] for data in rows.values() if data})
+    waiting_services = sorted({data["service"] for data in rows.values() if data and data["status"] == "waiting"})
+
+    pipe = r.pipeline(transaction=False)
+    for service in services:
+        pipe.get(f"current_number:{service}")
+    for service in waiting_services:
+        query = f"@service:{service} @status:{{waiting}}"
+        pipe.execute_command(
+            "FT.SEARCH", "idx:ticket", query, "RETURN", "1", "created_at",
+            "SORTBY", "created_at", "ASC", "LIMIT", "0", "10000"
+        )
+    results = pipe.execute(raise_on_error=False)
+
+    current_numbers = dict(zip(services, results[:len(services)]))
+    # 依 created_at 由小到大取回，被 LIMIT 截斷時只保證最早的那一段是完整的
+    waiting_created: dict[str, list[float]] = {}
+    truncated: set[str] = set()
+    for service, res in zip(waiting_services, results[len(services):]):
+        if isinstance(res, redis.exceptions.ResponseError):
+            if "no such index" in str(res).lower(): ensure_index_exists()
+            waiting_created[service] = []
+            continue
+        created = []
+        for fields in res[2::2]:
+            fd = {fields[i]: fields[i+1] for i in range(0, len(fields), 2)}
+            if fd.get("created_at"): created.append(float(fd["created_at"]))
+        waiting_created[service] = created
+        if res[0] > len(created): truncated.add(service)
+
+    ahead_counts: dict[int, int] = {}
+    exact_needed: list[int] = []
+    for tid, data in rows.items():
+        if not data or data["status"] != "waiting": continue
+        service = data["service"]
+        created = waiting_created.get(service, [])
+        my_created = float(data["created_at"])
+        # 超出已取回範圍的票，bisect 數不準，改用跟單張查詢相同的精確計數
+        if service in truncated and (not created or my_created > created[-1]):
+            exact_needed.append(tid)
+        else:
+            ahead_counts[tid] = bisect_left(created, my_created)
+
+    if exact_needed:
+        pipe = r.pipeline(transaction=False)
+        for tid in exact_needed:
+            data = rows[tid]
+            my_created = float(data["created_at"])
+            query = f"@service:{data['service']} @status:{{waiting}} @created_at:[-inf {my_created - 0.001}]"
+            pipe.execute_command("FT.SEARCH", "idx:ticket", query, "LIMIT", "0", "0")
+        for tid, res in zip(exact_needed, pipe.execute(raise_on_error=False)):
+            ahead_counts[tid] = 0 if isinstance(res, Exception) else res[0]
+
+    statuses: dict[int, dict | None] = {}
+    for tid, data in rows.items():
+        if not data:
+            statuses[tid] = None
+            continue
+        current_number = current_numbers.get(data["service"])
+        if isinstance(current_number, Exception): current_number = None
+        statuses[tid] = _format_ticket_status(tid, data, ahead_counts.get(tid, 0), current_number)
+    return statuses
+
+# get_queue_versions: 只讀版本號 (給 ETag 用)，看板沒變化時不必跑 FT.SEARCH
+# 有查無的票時一併帶上 ticket:global:id，該 id 之後被建立時 ETag 也會跟著變
+def get_queue_versions(ticket_ids: list[int]) -> dict[str, int]:
+    ticket_ids = list(dict.fromkeys(int(tid) for tid in ticket_ids))
+    if not ticket_ids: return {}
+
+    pipe = r.pipeline(transaction=False)
+    for tid in ticket_ids:
+        pipe.hget(f"ticket:{tid}", "service")
+    ticket_services = pipe.execute()
+
+    services = sorted({s for s in ticket_services if s})
+    has_missing = any(s is None for s in ticket_services)
+
+    pipe = r.pipeline(transaction=False)
+    for service in services:
+        pipe.get(version_key(service))
+    if has_missing:
+        pipe.get("ticket:global:id")
+    values = pipe.execute()
+
+    versions = {service: int(v or 0) for service, v in zip(services, values)}
+    if has_missing:
+        versions["ticket:global:id"] = int(values[-1] or 0)
+    return versions
+
 def get_stats_for_date(date_str: str) -> list[dict]:
     pattern = f"stats:{date_str}:*"
     results: list[dict] = []